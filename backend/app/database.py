@@ -1,7 +1,9 @@
 # backend/app/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import json
 import os
 
 # SQLite database (perfect for local development)
@@ -22,4 +24,36 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# One-shot migrations for databases created before a column or index existed
+def run_migrations():
+    with engine.connect() as conn:
+        # Take the write lock before checking, so processes starting together
+        # wait for each other instead of both running the ALTER
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        columns = {c["name"] for c in inspect(conn).get_columns("templates")}
+        
+        if "field_count" not in columns:
+            try:
+                conn.execute(text("ALTER TABLE templates ADD COLUMN field_count INTEGER DEFAULT 0"))
+            except OperationalError as e:
+                if "duplicate column name" not in str(e):
+                    raise
+                # Already migrated by another process
+            else:
+                # Backfill from the stored schema
+                rows = conn.execute(text("SELECT id, schema FROM templates")).all()
+                for template_id, schema in rows:
+                    sections = json.loads(schema or "{}").get("sections", [])
+                    field_count = sum(len(section.get("fields", [])) for section in sections)
+                    conn.execute(
+                        text("UPDATE templates SET field_count = :field_count WHERE id = :id"),
+                        {"field_count": field_count, "id": template_id}
+                    )
+        
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_templates_category ON templates (category)"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_templates_category_created ON templates (category, created_at)"
+        ))
+        conn.commit()
\ No newline at end of file
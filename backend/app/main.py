@@ -1,29 +1,65 @@
 # backend/app/main.py
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
 import os
-import shutil
-import tempfile
 import uuid
+import aiofiles
 from datetime import datetime
+from typing import Optional
+from urllib.parse import quote
 
 # Local imports
-from .database import engine, get_db, Base
+from .database import engine, get_db, Base, SessionLocal, run_migrations
 from .models.template import Template
+from .schemas.template import TemplateListOut
 from .services.template_parser import TemplateParser
-from .services.document_generator import DocumentGenerator
+from .services.document_generator import DocumentGenerator, TEMPLATE_CACHE_SIZE
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+run_migrations()
+# Close the connections used above; with preload_app gunicorn workers would
+# otherwise inherit them across fork(), which SQLite does not allow
+engine.dispose()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the render cache with the most recently added templates
+    db = SessionLocal()
+    try:
+        recent = (
+            db.query(Template.file_path)
+            .order_by(Template.created_at.desc())
+            .limit(TEMPLATE_CACHE_SIZE)
+            .all()
+        )
+    finally:
+        db.close()
+    for (file_path,) in recent:
+        document_generator.preload(file_path)
+    
+    # Document rendering blocks, so it runs off the event loop; one pool per
+    # app run, so a restarted app gets a fresh one
+    app.state.render_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    try:
+        yield
+    finally:
+        app.state.render_executor.shutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Auto Letter Generator",
     description="Automatic letter generation system with template parsing",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Enable CORS for frontend development
@@ -37,12 +73,24 @@ app.add_middleware(
 
 # Create directories
 os.makedirs("templates", exist_ok=True)
-os.makedirs("temp", exist_ok=True)
+
+# Size of each chunk read from an upload while streaming it to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Largest page returned by the template listing
+MAX_PAGE_SIZE = 200
 
 # Initialize services
 template_parser = TemplateParser()
 document_generator = DocumentGenerator()
 
+def remove_file(path: str):
+    """Delete a file, ignoring it if it is already gone"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
 # Basic routes
 @app.get("/")
 def read_root():
@@ -73,36 +121,36 @@ async def upload_template(
         stored_filename = f"{file_id}{file_extension}"
         file_path = f"templates/{stored_filename}"
         
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Save uploaded file, streaming it to disk in chunks
+        async with aiofiles.open(file_path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await out.write(chunk)
         
         # Parse template
         parse_result = template_parser.parse_template(file_path)
         
         if not parse_result["success"]:
             # Clean up failed file
-            os.remove(file_path)
+            remove_file(file_path)
             raise HTTPException(400, f"Template parsing failed: {parse_result['error']}")
         
-        # Save template to database
+        # Save template to database; RETURNING avoids a refresh round-trip
         template_name = name or os.path.splitext(file.filename)[0]
-        template = Template(
+        stmt = insert(Template).values(
             name=template_name,
             original_filename=file.filename,
             category=category,
             schema=parse_result["schema"],
+            field_count=parse_result["field_count"],
             file_path=file_path
-        )
-        
-        db.add(template)
+        ).returning(Template.id)
+        template_id = db.execute(stmt).scalar_one()
         db.commit()
-        db.refresh(template)
         
         return {
             "success": True,
-            "template_id": template.id,
-            "name": template.name,
+            "template_id": template_id,
+            "name": template_name,
             "field_count": parse_result["field_count"],
             "schema": parse_result["schema"],
             "message": f"Template uploaded successfully with {parse_result['field_count']} fields detected"
@@ -110,26 +158,35 @@ async def upload_template(
         
     except Exception as e:
         # Clean up on error
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
+        if 'file_path' in locals():
+            remove_file(file_path)
         raise HTTPException(500, f"Upload failed: {str(e)}")
 
-@app.get("/api/templates")
-def list_templates(db: Session = Depends(get_db)):
-    """Get all templates"""
-    templates = db.query(Template).all()
+@app.get("/api/templates", response_model=TemplateListOut)
+def list_templates(
+    limit: int = 50,
+    after_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get templates, paginated by id (pass the last seen id as after_id)"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    # Select only the listed columns; the schema JSON is not needed here
+    query = db.query(
+        Template.id,
+        Template.name,
+        Template.category,
+        Template.original_filename,
+        Template.field_count,
+        Template.created_at
+    )
+    if after_id is not None:
+        query = query.filter(Template.id > after_id)
+    templates = query.order_by(Template.id).limit(limit).all()
+    
     return {
-        "templates": [
-            {
-                "id": t.id,
-                "name": t.name,
-                "category": t.category,
-                "original_filename": t.original_filename,
-                "field_count": len(t.schema.get("sections", [])),
-                "created_at": t.created_at.isoformat() if t.created_at else None
-            }
-            for t in templates
-        ]
+        "templates": templates,
+        "next_after_id": templates[-1].id if len(templates) == limit else None
     }
 
 @app.get("/api/templates/{template_id}")
@@ -153,6 +210,7 @@ def get_template(template_id: int, db: Session = Depends(get_db)):
 async def generate_document(
     template_id: int,
     form_data: dict,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Generate document from template and form data"""
@@ -163,20 +221,28 @@ async def generate_document(
         raise HTTPException(404, "Template not found")
     
     try:
-        # Generate document
-        output_path = document_generator.generate_document(
-            template.file_path, 
+        # Generate document in memory without blocking the event loop
+        loop = asyncio.get_running_loop()
+        buffer = await loop.run_in_executor(
+            request.app.state.render_executor,
+            document_generator.generate_document,
+            template.file_path,
             form_data
         )
         
         # Return file for download
         filename = f"generated_{template.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+        quoted_filename = quote(filename)
+        if quoted_filename == filename:
+            content_disposition = f'attachment; filename="{filename}"'
+        else:
+            content_disposition = f"attachment; filename*=utf-8''{quoted_filename}"
         
-        return FileResponse(
-            output_path,
-            filename=filename,
+        # Send the rendered file as one body so Content-Length is set
+        return Response(
+            buffer.getvalue(),
             media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            background=lambda: os.unlink(output_path) if os.path.exists(output_path) else None
+            headers={"Content-Disposition": content_disposition}
         )
         
     except Exception as e:
@@ -191,8 +257,7 @@ def delete_template(template_id: int, db: Session = Depends(get_db)):
         raise HTTPException(404, "Template not found")
     
     # Delete file
-    if os.path.exists(template.file_path):
-        os.remove(template.file_path)
+    remove_file(template.file_path)
     
     # Delete from database
     db.delete(template)
@@ -353,7 +418,7 @@ def inspect_template_content(template_id: int, db: Session = Depends(get_db)):
         
     except Exception as e:
         return {"error": str(e), "template_path": template.file_path}
-    
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+
+
+# Production: gunicorn -c gunicorn_conf.py app.main:app
+# Development: uvicorn app.main:app --reload
@@ -1,16 +1,20 @@
 # backend/app/models/template.py
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
 class Template(Base):
     __tablename__ = "templates"
+    __table_args__ = (
+        Index("ix_templates_category_created", "category", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     original_filename = Column(String, nullable=False)
-    category = Column(String, default="general")
+    category = Column(String, default="general", index=True)
     schema = Column(JSON)  # Form fields configuration
+    field_count = Column(Integer, default=0)  # Number of fields in schema, kept for listings
     file_path = Column(String, nullable=False)  # Template file location
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,19 @@
+# backend/app/schemas/template.py
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+
+class TemplateOut(BaseModel):
+    """Template as shown in listings"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    name: str
+    category: Optional[str] = None
+    original_filename: str
+    field_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+class TemplateListOut(BaseModel):
+    templates: List[TemplateOut]
+    next_after_id: Optional[int] = None
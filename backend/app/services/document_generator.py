@@ -1,158 +1,227 @@
 # backend/app/services/document_generator.py
 from docx import Document
-import tempfile
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+from docx.text.paragraph import Paragraph
+from functools import lru_cache
+from io import BytesIO
+import copy
 import os
 import re
-from typing import Dict, Any, List
+import zipfile
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from .docx_utils import STORY_CONTENT_TYPES, iter_paragraphs, iter_placeholders
+
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+_CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+
+def _find_placeholders(text: str, user_data: Dict[str, str]) -> List[Tuple[int, int, str]]:
+    """Spans of the placeholders in text that the user supplied values for"""
+    return [span for span in iter_placeholders(text) if span[2] in user_data]
+
+def _substitute(text: str, user_data: Dict[str, str]) -> Tuple[str, int]:
+    """Replace supplied placeholders in text; returns the new text and the count"""
+    parts = []
+    last = 0
+    for start, end, name in iter_placeholders(text):
+        value = user_data.get(name)
+        if value is None:
+            continue
+        parts.append(text[last:start])
+        parts.append(value)
+        last = end
+    if not parts:
+        return text, 0
+    parts.append(text[last:])
+    return ''.join(parts), len(parts) // 2
+
+# Number of templates kept parsed in memory
+TEMPLATE_CACHE_SIZE = 32
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _load_template(path: str, mtime_ns: int) -> Tuple[bytes, Dict[str, Tuple[Any, List[int]]]]:
+    """Read a template and pre-parse its story parts; cached until the file's mtime changes
+    
+    Returns the raw docx bytes and, for each body/header/footer part that contains
+    a placeholder, its parsed XML root plus the document-order indices of the
+    paragraphs holding one. Parts without placeholders are copied verbatim, and
+    renders only visit the indexed paragraphs.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    story_parts = {}
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        content_types = parse_xml(zf.read('[Content_Types].xml'))
+        for override in content_types.iter(f'{{{_CT_NS}}}Override'):
+            if override.get('ContentType') not in STORY_CONTENT_TYPES:
+                continue
+            name = override.get('PartName').lstrip('/')
+            root = parse_xml(zf.read(name))
+            indices = [i for i, paragraph in enumerate(iter_paragraphs(root)) if '{{' in paragraph.text]
+            if indices:
+                story_parts[name] = (root, indices)
+    
+    return data, story_parts
 
 class DocumentGenerator:
-    def __init__(self):
-        self.placeholder_pattern = r'\{\{(\w+)\}\}'
+    def preload(self, template_path: str) -> bool:
+        """Load a template into the render cache ahead of its first use"""
+        try:
+            _load_template(template_path, os.stat(template_path).st_mtime_ns)
+            return True
+        except Exception:
+            return False
     
-    def generate_document(self, template_path: str, user_data: Dict[str, Any]) -> str:
-        """Generate a document from template and user data"""
+    def generate_document(self, template_path: str, user_data: Dict[str, Any], output: Optional[BinaryIO] = None) -> BinaryIO:
+        """Generate a document from template and user data
+        
+        The docx is written to output if given (e.g. a response buffer or an
+        open file), otherwise to a new BytesIO; seekable streams are returned rewound.
+        """
         try:
-            # Load the template document
-            doc = Document(template_path)
+            # Reuse the cached, pre-parsed template instead of loading it through
+            # python-docx; only the parts holding placeholders are copied and edited
+            data, story_parts = _load_template(template_path, os.stat(template_path).st_mtime_ns)
             
             # Process all content with improved placeholder handling
-            self._process_paragraphs(doc.paragraphs, user_data)
-            self._process_tables(doc.tables, user_data)
-            self._process_headers_footers(doc.sections, user_data)
+            user_data = {key: str(value) for key, value in user_data.items()}
+            rendered_parts = {}
+            for name, (root, indices) in story_parts.items():
+                # The copy has the same document order, so the indices carry over
+                root = copy.deepcopy(root)
+                elements = list(root.iter(qn('w:p')))
+                self._process_paragraphs([Paragraph(elements[i], None) for i in indices], user_data)
+                rendered_parts[name] = serialize_part_xml(root)
             
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.docx')
-            doc.save(temp_file.name)
-            temp_file.close()
+            # Repackage straight into the output stream; nothing touches a temp file
+            buffer = BytesIO() if output is None else output
+            with zipfile.ZipFile(BytesIO(data)) as zin, zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    zout.writestr(info, rendered_parts.get(info.filename) or zin.read(info))
+            if buffer.seekable():
+                buffer.seek(0)
             
-            return temp_file.name
+            return buffer
             
         except Exception as e:
             raise Exception(f"Document generation failed: {str(e)}")
     
-    def _process_paragraphs(self, paragraphs, user_data: Dict[str, Any]):
+    def _process_paragraphs(self, paragraphs, user_data: Dict[str, str]):
         """Process paragraphs and replace placeholders while preserving formatting"""
         for paragraph in paragraphs:
-            # Get full paragraph text to check for placeholders
-            full_text = paragraph.text
-            if not self._contains_placeholders(full_text):
+            # Offsets are taken over the runs that get edited, not paragraph.text,
+            # which also holds hyperlink text
+            runs = paragraph.runs
+            text = ''.join(run.text for run in runs)
+            
+            # Cheap substring check rejects most paragraphs before any scanning
+            if '{{' not in text:
+                continue
+            
+            # Only placeholders with a supplied value need any run edits
+            placeholders = _find_placeholders(text, user_data)
+            if not placeholders:
+                continue
+            
+            # Fastest path: a single run holds the whole paragraph text
+            if len(runs) == 1:
+                runs[0].text = _substitute(runs[0].text, user_data)[0]
+                continue
+            
+            # Fast path: every placeholder sits inside a single run
+            if self._replace_within_runs(runs, user_data, len(placeholders)):
                 continue
             
             # Use the new method to handle split placeholders
-            self._replace_split_placeholders(paragraph, user_data)
+            self._replace_split_placeholders(runs, user_data, placeholders)
     
-    def _replace_split_placeholders(self, paragraph, user_data: Dict[str, Any]):
-        """Replace placeholders that might be split across multiple runs"""
-        full_text = paragraph.text
+    def _replace_within_runs(self, runs, user_data: Dict[str, str], expected: int) -> bool:
+        """Replace placeholders run by run; returns False if any placeholder spans runs"""
+        updates = []
+        found = 0
+        for run in runs:
+            text = run.text
+            if '{{' not in text:
+                continue
+            new_text, count = _substitute(text, user_data)
+            if count:
+                updates.append((run, new_text))
+                found += count
         
-        # Find all placeholders in the complete text
-        placeholders = list(re.finditer(self.placeholder_pattern, full_text))
-        if not placeholders:
-            return
+        # Some placeholders were split across runs (or live outside plain runs)
+        if found != expected:
+            return False
         
-        # Process placeholders from right to left to maintain positions
-        for match in reversed(placeholders):
-            placeholder_name = match.group(1)
-            replacement_value = str(user_data.get(placeholder_name, f"{{{{{placeholder_name}}}}}"))
-            start_pos, end_pos = match.span()
-            
-            # Replace the text across runs
-            self._replace_text_across_runs(paragraph, start_pos, end_pos, replacement_value)
+        for run, new_text in updates:
+            run.text = new_text
+        return True
     
-    def _replace_text_across_runs(self, paragraph, start_pos: int, end_pos: int, replacement_text: str):
-        """Replace text that spans across multiple runs"""
-        # Build a map of character positions to runs
-        runs_info = []
-        current_pos = 0
+    def _replace_split_placeholders(self, runs, user_data: Dict[str, str], placeholders: List[Tuple[int, int, str]]):
+        """Replace placeholders that might be split across multiple runs
         
-        for run_index, run in enumerate(paragraph.runs):
-            run_length = len(run.text)
-            runs_info.append({
-                'run': run,
-                'run_index': run_index,
-                'start_pos': current_pos,
-                'end_pos': current_pos + run_length,
-                'original_text': run.text
-            })
-            current_pos += run_length
-        
-        # Find which runs are affected by the replacement
-        affected_runs = []
-        for run_info in runs_info:
-            # Check if this run overlaps with the replacement range
-            if run_info['start_pos'] < end_pos and run_info['end_pos'] > start_pos:
-                affected_runs.append(run_info)
-        
-        if not affected_runs:
-            return
-        
-        # Calculate what part of each run to keep/replace
-        for i, run_info in enumerate(affected_runs):
-            run = run_info['run']
-            run_start = run_info['start_pos']
-            run_end = run_info['end_pos']
-            original_text = run_info['original_text']
-            
-            # Calculate the slice positions within this run
-            slice_start = max(0, start_pos - run_start)
-            slice_end = min(len(original_text), end_pos - run_start)
-            
-            if i == 0:
-                # First affected run: keep text before placeholder + replacement
-                new_text = original_text[:slice_start] + replacement_text + original_text[slice_end:]
-                run.text = new_text
-            else:
-                # Other affected runs: keep text after placeholder (if any)
-                if slice_end < len(original_text):
-                    run.text = original_text[slice_end:]
-                else:
-                    run.text = ""
-    
-    def _process_tables(self, tables, user_data: Dict[str, Any]):
-        """Process tables and replace placeholders"""
-        for table in tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    self._process_paragraphs(cell.paragraphs, user_data)
-    
-    def _process_headers_footers(self, sections, user_data: Dict[str, Any]):
-        """Process headers and footers"""
-        for section in sections:
-            # Process header
-            if section.header:
-                self._process_paragraphs(section.header.paragraphs, user_data)
-            
-            # Process footer  
-            if section.footer:
-                self._process_paragraphs(section.footer.paragraphs, user_data)
-    
-    def _contains_placeholders(self, text: str) -> bool:
-        """Check if text contains placeholders"""
-        return bool(re.search(self.placeholder_pattern, text))
+        Walks the runs and the (sorted) placeholder spans together left to right,
+        so each run's new text is built and assigned at most once.
+        """
+        k = 0
+        run_start = 0
+        for run in runs:
+            text = run.text
+            run_end = run_start + len(text)
+            
+            pieces = []
+            cursor = run_start  # Paragraph offset up to which this run's text is handled
+            while text and k < len(placeholders) and placeholders[k][0] < run_end:
+                start_pos, end_pos, placeholder_name = placeholders[k]
+                if start_pos >= run_start:
+                    # Placeholder starts here: keep the text before it, then the value
+                    pieces.append(text[cursor - run_start:start_pos - run_start])
+                    pieces.append(user_data[placeholder_name])
+                # A placeholder started in an earlier run just drops its remaining characters
+                cursor = min(end_pos, run_end)
+                if end_pos > run_end:
+                    # Continues into the next run
+                    break
+                k += 1
+            
+            if cursor != run_start or pieces:
+                pieces.append(text[cursor - run_start:])
+                run.text = ''.join(pieces)
+            
+            run_start = run_end
     
     def preview_replacements(self, template_path: str, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Preview what replacements will be made (for debugging)"""
         try:
-            doc = Document(template_path)
+            # Parse from the cached template bytes rather than re-reading the file
+            data, _ = _load_template(template_path, os.stat(template_path).st_mtime_ns)
+            doc = Document(BytesIO(data))
             replacements = []
             
+            # Stringify each value once, however often its placeholder repeats
+            rendered = {key: str(value) for key, value in user_data.items()}
+            
+            def replace_match(match):
+                key = match.group(1)
+                value = rendered.get(key)
+                return f"{{{{ {key} }}}}" if value is None else value
+            
             # Check paragraphs
             for i, paragraph in enumerate(doc.paragraphs):
                 original = paragraph.text
-                if self._contains_placeholders(original):
-                    # Simulate replacement
-                    def replace_match(match):
-                        key = match.group(1)
-                        return str(user_data.get(key, f"{{{{ {key} }}}}"))
-                    
-                    replaced = re.sub(self.placeholder_pattern, replace_match, original)
-                    if original != replaced:
-                        replacements.append({
-                            "type": "paragraph",
-                            "index": i,
-                            "original": original,
-                            "replaced": replaced
-                        })
+                if '{{' not in original:
+                    continue
+                
+                # Simulate replacement; sub() leaves text without placeholders untouched
+                replaced, count = _PLACEHOLDER_RE.subn(replace_match, original)
+                if count and original != replaced:
+                    replacements.append({
+                        "type": "paragraph",
+                        "index": i,
+                        "original": original,
+                        "replaced": replaced
+                    })
             
             return {
                 "success": True,
@@ -0,0 +1,60 @@
+# backend/app/services/docx_utils.py
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+
+# Parts whose text can hold placeholders: the body, headers and footers
+STORY_CONTENT_TYPES = {CT.WML_DOCUMENT_MAIN, CT.WML_HEADER, CT.WML_FOOTER}
+
+# Text nodes plus the elements that separate them, in document order. Only
+# runs directly in a paragraph count: those are the paragraph.runs the
+# generator edits, so text inside hyperlinks, inline content controls, tracked
+# insertions, smart tags or simple fields is left out.
+_RUN_CHILD = '*[self::w:t or self::w:tab or self::w:ptab or self::w:br or self::w:cr or self::w:noBreakHyphen]'
+_TEXT_XPATH = f'.//w:p | .//w:p/w:r/{_RUN_CHILD}'
+_W_T = qn('w:t')
+
+def iter_placeholders(text: str):
+    r"""Yield (start, end, name) for each {{name}} in text, name being word characters
+    
+    Same matches as re.finditer(r'\{\{(\w+)\}\}', text), found with str.find
+    so no match objects or regex state are created.
+    """
+    i = 0
+    n = len(text)
+    while True:
+        start = text.find('{{', i)
+        if start < 0:
+            return
+        # Consume the name's word characters, then "}}" must follow right there
+        end = start + 2
+        while end < n and (text[end].isalnum() or text[end] == '_'):
+            end += 1
+        if end > start + 2 and text.startswith('}}', end):
+            yield start, end + 2, text[start + 2:end]
+            i = end + 2
+        else:
+            # Not a placeholder; only "{{{" can start another one before end,
+            # so the total work stays linear in len(text)
+            i = start + 1
+
+def iter_paragraphs(element):
+    """Yield every paragraph below element, including those in tables"""
+    # Materialize the element list so run edits can't disturb the tree walk
+    for p in list(element.iter(qn('w:p'))):
+        yield Paragraph(p, None)
+
+def iter_story_elements(doc):
+    """Yield the root XML element of a document's body, header and footer parts"""
+    for part in doc.part.package.iter_parts():
+        if part.content_type in STORY_CONTENT_TYPES:
+            yield part.element
+
+def story_text(element) -> str:
+    """Concatenate the paragraph text below element in one lxml pass
+    
+    Paragraph boundaries and inline tabs/breaks become newlines, so text
+    can't run together across them.
+    """
+    nodes = element.xpath(_TEXT_XPATH)
+    return ''.join((node.text or '') if node.tag == _W_T else '\n' for node in nodes)
@@ -2,12 +2,28 @@
 from docx import Document
 import re
 import json
+from functools import lru_cache
 from typing import List, Dict, Any
+from .docx_utils import iter_placeholders, iter_story_elements, story_text
+
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """Compile keywords into one alternation matching any of them as a substring"""
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+# Prefix of the input hint shown in every form field
+_INPUT_HINT_PREFIX = "Masukkan "
+
+# Input type patterns, in priority order (the first match wins)
+_TYPE_PATTERNS = [
+    (_keyword_pattern(['tanggal', 'date']), 'date'),
+    (_keyword_pattern(['email', 'surel']), 'email'),
+    (_keyword_pattern(['nomor', 'number', 'nim', 'nip']), 'text'),
+    (_keyword_pattern(['judul', 'title', 'kegiatan', 'activity', 'deskripsi', 'description']), 'textarea'),
+    (_keyword_pattern(['telepon', 'phone', 'hp']), 'tel'),
+]
 
 class TemplateParser:
     def __init__(self):
-        self.placeholder_pattern = r'\{\{(\w+)\}\}'
-        
         # Indonesian-specific field patterns for better categorization
         self.field_groups = {
             "header": ["nomor", "number", "tanggal", "date", "lampiran", "attachment", "hal", "subject", "perihal"],
@@ -17,9 +33,17 @@ class TemplateParser:
             "signature": ["penandatangan", "signer", "nip", "jabatan", "position", "direktur", "kepala"],
             "other": []
         }
+        
+        # One compiled keyword alternation per section, in section order
+        self._section_patterns = {
+            section_name: _keyword_pattern(keywords)
+            for section_name, keywords in self.field_groups.items()
+            if keywords
+        }
     
     def parse_template(self, file_path: str) -> Dict[str, Any]:
         """Parse a DOCX template and extract field information"""
+        # Not cached: each template is parsed once, when it is uploaded
         try:
             doc = Document(file_path)
             placeholders = self._extract_placeholders(doc)
@@ -44,61 +68,26 @@ class TemplateParser:
         """Extract all placeholder fields from the document"""
         placeholders = set()
         
-        # Extract from paragraphs
-        for paragraph in doc.paragraphs:
-            matches = re.findall(self.placeholder_pattern, paragraph.text)
-            placeholders.update(matches)
-        
-        # Extract from tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        matches = re.findall(self.placeholder_pattern, paragraph.text)
-                        placeholders.update(matches)
-        
-        # Extract from headers and footers
-        for section in doc.sections:
-            header = section.header
-            footer = section.footer
-            
-            for paragraph in header.paragraphs:
-                matches = re.findall(self.placeholder_pattern, paragraph.text)
-                placeholders.update(matches)
-                
-            for paragraph in footer.paragraphs:
-                matches = re.findall(self.placeholder_pattern, paragraph.text)
-                placeholders.update(matches)
+        # One text pass and one placeholder scan per body/header/footer part
+        for element in iter_story_elements(doc):
+            placeholders.update(name for _, _, name in iter_placeholders(story_text(element)))
         
         return sorted(list(placeholders))
     
     def _generate_schema(self, placeholders: List[str]) -> Dict[str, Any]:
         """Generate form schema from placeholders"""
         schema = {"sections": []}
-        used_fields = set()
         
-        # Group fields into sections
-        for section_name, keywords in self.field_groups.items():
-            if section_name == "other":
-                continue
-                
-            section_fields = []
-            for placeholder in placeholders:
-                if placeholder in used_fields:
-                    continue
-                    
-                # Check if this field belongs to this section
-                if any(keyword in placeholder.lower() for keyword in keywords):
-                    field_config = {
-                        "name": placeholder,
-                        "label": self._humanize_field(placeholder),
-                        "type": self._infer_field_type(placeholder),
-                        "required": True,
-                        "placeholder": f"Masukkan {self._humanize_field(placeholder).lower()}..."
-                    }
-                    section_fields.append(field_config)
-                    used_fields.add(placeholder)
-            
+        # Lowercase and humanize each field once
+        entries = [(placeholder, placeholder.lower(), self._humanize_field(placeholder)) for placeholder in placeholders]
+        
+        # Classify each field into its section bucket in a single pass
+        buckets = {section_name: [] for section_name in self.field_groups}
+        for placeholder, lower, label in entries:
+            buckets[self._classify_section(lower)].append(self._make_field(placeholder, label))
+        
+        # Emit non-empty sections in display order ("other" comes last)
+        for section_name, section_fields in buckets.items():
             if section_fields:
                 schema["sections"].append({
                     "name": section_name,
@@ -106,29 +95,28 @@ class TemplateParser:
                     "fields": section_fields
                 })
         
-        # Add remaining fields to "other" section
-        other_fields = []
-        for placeholder in placeholders:
-            if placeholder not in used_fields:
-                field_config = {
-                    "name": placeholder,
-                    "label": self._humanize_field(placeholder),
-                    "type": self._infer_field_type(placeholder),
-                    "required": True,
-                    "placeholder": f"Masukkan {self._humanize_field(placeholder).lower()}..."
-                }
-                other_fields.append(field_config)
-        
-        if other_fields:
-            schema["sections"].append({
-                "name": "other",
-                "title": "Lainnya",
-                "fields": other_fields
-            })
-        
         return schema
     
-    def _humanize_field(self, field_name: str) -> str:
+    def _make_field(self, placeholder: str, label: str) -> Dict[str, Any]:
+        """Build the form field config for a placeholder"""
+        return {
+            "name": placeholder,
+            "label": label,
+            "type": self._infer_field_type(placeholder),
+            "required": True,
+            "placeholder": _INPUT_HINT_PREFIX + label.lower() + "..."
+        }
+    
+    def _classify_section(self, lower_name: str) -> str:
+        """Return the first section with a keyword in a lowercased field name"""
+        for section_name, pattern in self._section_patterns.items():
+            if pattern.search(lower_name):
+                return section_name
+        return "other"
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _humanize_field(field_name: str) -> str:
         """Convert field name to human-readable format"""
         # Handle common Indonesian abbreviations
         replacements = {
@@ -149,22 +137,16 @@ class TemplateParser:
         # Convert snake_case to Title Case
         return field_name.replace('_', ' ').title()
     
-    def _infer_field_type(self, field_name: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _infer_field_type(field_name: str) -> str:
         """Infer the appropriate input type for a field"""
         lower_name = field_name.lower()
         
-        if any(word in lower_name for word in ['tanggal', 'date']):
-            return 'date'
-        elif any(word in lower_name for word in ['email', 'surel']):
-            return 'email'
-        elif any(word in lower_name for word in ['nomor', 'number', 'nim', 'nip']):
-            return 'text'
-        elif any(word in lower_name for word in ['judul', 'title', 'kegiatan', 'activity', 'deskripsi', 'description']):
-            return 'textarea'
-        elif any(word in lower_name for word in ['telepon', 'phone', 'hp']):
-            return 'tel'
-        else:
-            return 'text'
+        for pattern, field_type in _TYPE_PATTERNS:
+            if pattern.search(lower_name):
+                return field_type
+        return 'text'
     
     def _translate_section_name(self, section_name: str) -> str:
         """Translate section names to Indonesian"""
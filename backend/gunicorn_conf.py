@@ -0,0 +1,17 @@
+# backend/gunicorn_conf.py
+# Run with: gunicorn -c gunicorn_conf.py app.main:app
+import multiprocessing
+
+bind = "0.0.0.0:8000"
+
+# Document rendering is CPU-bound, so run one event loop per worker process
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master so table creation and migrations run
+# before any worker forks
+preload_app = True
+
+# Recycle workers periodically to bound memory growth
+max_requests = 500
+max_requests_jitter = 200
@@ -0,0 +1,46 @@
+from docx import Document
+
+from app.services.document_generator import DocumentGenerator
+
+
+def _render(tmp_path, runs, user_data):
+    """Render a one-paragraph template built from runs; returns the output run texts"""
+    path = str(tmp_path / "template.docx")
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    for text in runs:
+        paragraph.add_run(text)
+    doc.save(path)
+    
+    output = DocumentGenerator().generate_document(path, user_data)
+    return [run.text for run in Document(output).paragraphs[0].runs]
+
+
+def test_placeholder_starting_mid_run(tmp_path):
+    runs = _render(tmp_path, ["Nama: {{na", "ma}} ok"], {"nama": "Budi"})
+    assert runs == ["Nama: Budi", " ok"]
+
+
+def test_placeholder_spanning_three_runs(tmp_path):
+    runs = _render(tmp_path, ["Hi {{", "nam", "a}}!"], {"nama": "Budi"})
+    assert runs == ["Hi Budi", "", "!"]
+
+
+def test_placeholder_without_value_is_left_in_place(tmp_path):
+    runs = _render(tmp_path, ["{{nama}} {{ni", "m}} {{kota}}"], {"nim": "123"})
+    assert runs == ["{{nama}} 123", " {{kota}}"]
+
+
+def test_split_placeholder_without_value_is_left_in_place(tmp_path):
+    runs = _render(tmp_path, ["{{na", "ma}} {{ni", "m}}"], {"nim": "123"})
+    assert runs == ["{{na", "ma}} 123", ""]
+
+
+def test_several_placeholders_in_one_run(tmp_path):
+    runs = _render(tmp_path, ["{{a}}-{{b}}-{{a}}", " tail {{b}}"], {"a": "A", "b": "B"})
+    assert runs == ["A-B-A", " tail B"]
+
+
+def test_single_run_paragraph(tmp_path):
+    runs = _render(tmp_path, ["{{a}} and {{b}}, not {{c}}"], {"a": 1, "b": "B"})
+    assert runs == ["1 and B, not {{c}}"]
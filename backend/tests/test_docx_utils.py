@@ -0,0 +1,42 @@
+import random
+import re
+
+import pytest
+
+from app.services.docx_utils import iter_placeholders
+
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+def _regex_spans(text):
+    return [(m.start(), m.end(), m.group(1)) for m in _PLACEHOLDER_RE.finditer(text)]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "{{a}}",
+    "{{{a}}",
+    "{{a}b}}",
+    "{{}}",
+    "{{a}}}",
+    "{{{{a}}}}",
+    "{{ a }} {{b_1}}",
+    "{{nama}}{{nim}}",
+    "{{tanggal_surat",
+    "x {{ é_1 }} {{é_1}}",
+])
+def test_matches_regex_spans(text):
+    assert list(iter_placeholders(text)) == _regex_spans(text)
+
+
+def test_matches_regex_spans_on_random_text():
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rng.choice('{{}}ab_ é\n') for _ in range(rng.randrange(40)))
+        assert list(iter_placeholders(text)) == _regex_spans(text)
+
+
+def test_unclosed_braces_scan_in_linear_time():
+    # Each "{{" is followed by a non-word character, so none of them may search ahead
+    text = '{{ x ' * 40000 + '}}'
+    assert list(iter_placeholders(text)) == []
@@ -0,0 +1,63 @@
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from app.services.document_generator import DocumentGenerator
+from app.services.template_parser import TemplateParser
+
+
+def _build_template(path):
+    """Template with one plain placeholder and two the generator can't reach"""
+    doc = Document()
+    paragraph = doc.add_paragraph("Tanggal: {{tanggal}}")
+    # Inline content control and tracked insertion around their own runs
+    paragraph._p.append(parse_xml(
+        '<w:sdt %s><w:sdtContent><w:r><w:t>{{nama}}</w:t></w:r></w:sdtContent></w:sdt>' % nsdecls('w')
+    ))
+    paragraph._p.append(parse_xml(
+        '<w:ins %s w:id="1" w:author="a"><w:r><w:t>{{nim}}</w:t></w:r></w:ins>' % nsdecls('w')
+    ))
+    doc.save(path)
+
+
+def test_placeholders_outside_plain_runs_are_not_listed(tmp_path):
+    path = str(tmp_path / "template.docx")
+    _build_template(path)
+    
+    result = TemplateParser().parse_template(path)
+    
+    assert result["success"]
+    assert result["placeholders"] == ["tanggal"]
+
+
+def test_every_listed_placeholder_is_replaced(tmp_path):
+    path = str(tmp_path / "template.docx")
+    _build_template(path)
+    placeholders = TemplateParser().parse_template(path)["placeholders"]
+    
+    output = DocumentGenerator().generate_document(path, {name: "X" for name in placeholders})
+    
+    text = Document(output).paragraphs[0].text
+    assert "{{" not in text
+    assert text == "Tanggal: X"
+
+
+def test_hyperlink_text_is_neither_listed_nor_misaligned(tmp_path):
+    path = str(tmp_path / "template.docx")
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    paragraph.add_run("Hi ")
+    paragraph._p.append(parse_xml(
+        '<w:hyperlink %s><w:r><w:t>{{nama}}</w:t></w:r></w:hyperlink>' % nsdecls('w')
+    ))
+    paragraph.add_run(" end {{a")
+    paragraph.add_run("}} z")
+    doc.save(path)
+    
+    assert TemplateParser().parse_template(path)["placeholders"] == ["a"]
+    
+    output = DocumentGenerator().generate_document(path, {"nama": "N", "a": "A"})
+    
+    paragraph = Document(output).paragraphs[0]
+    assert [run.text for run in paragraph.runs] == ["Hi ", " end A", " z"]
+    assert paragraph.text == "Hi {{nama}} end A z"
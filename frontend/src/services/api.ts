@@ -12,6 +12,9 @@ import {
 
 const API_BASE_URL = 'http://localhost:8000';
 
+// Largest page the backend serves for GET /api/templates
+const TEMPLATE_PAGE_SIZE = 200;
+
 // Create axios instance with default config
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -69,8 +72,20 @@ export class ApiService {
   }
 
   static async listTemplates(): Promise<ListTemplatesResponse> {
-    const response = await apiClient.get('/api/templates');
-    return response.data;
+    // The list is paginated; follow next_after_id until every page is loaded
+    const templates: Template[] = [];
+    let afterId: number | null | undefined = null;
+
+    do {
+      const response = await apiClient.get('/api/templates', {
+        params: { limit: TEMPLATE_PAGE_SIZE, after_id: afterId ?? undefined },
+      });
+      const page: ListTemplatesResponse = response.data;
+      templates.push(...page.templates);
+      afterId = page.next_after_id;
+    } while (afterId != null);
+
+    return { templates };
   }
 
   static async getTemplate(templateId: number): Promise<TemplateDetailResponse> {
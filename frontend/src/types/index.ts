@@ -56,6 +56,7 @@ export interface ApiError {
 
 export interface ListTemplatesResponse {
   templates: Template[];
+  next_after_id?: number | null;
 }
 
 export interface TemplateDetailResponse extends Template {